@@ -48,12 +48,18 @@ def get_pages_from_chunks(full_text: str, pages: list[dict], chunks: list) -> li
 
     current_page_index = 0
     current_page_start = 0
+    search_start = 0
 
     formatted_chunks = []
 
     for chunk in chunks:
         chunk_text = chunk["chunk_text"]
-        chunk_start = full_text.find(chunk_text)
+        # chunks appear in document order, so searching from where the previous chunk was found avoids re-scanning the full text for every chunk
+        chunk_start = full_text.find(chunk_text, search_start)
+        if chunk_start == -1:
+            chunk_start = full_text.find(chunk_text)
+        else:
+            search_start = chunk_start
         chunk_end = chunk_start + len(chunk_text)
 
         # Determine the page numbers for the current chunk
@@ -1,5 +1,6 @@
 import numpy as np
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+import functools
 import os
 import time
 import json
@@ -28,6 +29,14 @@ from dsrag.sectioning_and_chunking.semantic_sectioning import get_sections
 from dsrag.document_parsing import parse_file, get_pages_from_chunks
 
 
+@functools.lru_cache(maxsize=None)
+def _get_text_splitter(chunk_size: int) -> RecursiveCharacterTextSplitter:
+    # constructing a splitter compiles its separator list, so we build one per chunk_size and reuse it across all documents and sections
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=0, length_function=len
+    )
+
+
 class KnowledgeBase:
     def __init__(
         self,
@@ -219,74 +228,83 @@ class KnowledgeBase:
             print(f"Document with ID {doc_id} already exists in the KB. Skipping...")
             return
 
-        # semantic sectioning
-        if semantic_sectioning_config.get("use_semantic_sectioning", True):
-            llm_provider = semantic_sectioning_config.get("llm_provider", "openai")
-            model = semantic_sectioning_config.get("model", "gpt-4o-mini")
-            sections, _ = get_sections(text, llm_provider=llm_provider, model=model, language=self.kb_metadata["language"])
-        else:
-            sections = [
-                {
-                    "title": "",
-                    "content": text,
-                }
-            ]
+        # semantic sectioning runs in the background while the document title and summary are generated, since both stages only depend on the raw document text
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            sections_future = None
+            if semantic_sectioning_config.get("use_semantic_sectioning", True):
+                llm_provider = semantic_sectioning_config.get("llm_provider", "openai")
+                model = semantic_sectioning_config.get("model", "gpt-4o-mini")
+                sections_future = executor.submit(get_sections, text, llm_provider=llm_provider, model=model, language=self.kb_metadata["language"])
+
+            # document title and summary
+            if not document_title and auto_context_config.get("use_generated_title", True):
+                document_title_guidance = auto_context_config.get(
+                    "document_title_guidance", ""
+                )
+                document_title = get_document_title(
+                    self.auto_context_model,
+                    text,
+                    document_title_guidance=document_title_guidance,
+                    language=self.kb_metadata["language"]
+                )
+            elif not document_title:
+                document_title = doc_id
 
-        # document title and summary
-        if not document_title and auto_context_config.get("use_generated_title", True):
-            document_title_guidance = auto_context_config.get(
-                "document_title_guidance", ""
-            )
-            document_title = get_document_title(
-                self.auto_context_model,
-                text,
-                document_title_guidance=document_title_guidance,
-                language=self.kb_metadata["language"]
-            )
-        elif not document_title:
-            document_title = doc_id
+            if auto_context_config.get("get_document_summary", True):
+                document_summarization_guidance = auto_context_config.get(
+                    "document_summarization_guidance", ""
+                )
+                document_summary = get_document_summary(
+                    self.auto_context_model,
+                    text,
+                    document_title=document_title,
+                    document_summarization_guidance=document_summarization_guidance,
+                    language=self.kb_metadata["language"]
+                )
+            else:
+                document_summary = ""
 
-        if auto_context_config.get("get_document_summary", True):
-            document_summarization_guidance = auto_context_config.get(
-                "document_summarization_guidance", ""
-            )
-            document_summary = get_document_summary(
-                self.auto_context_model,
-                text,
-                document_title=document_title,
-                document_summarization_guidance=document_summarization_guidance,
-                language=self.kb_metadata["language"]
+            if sections_future is not None:
+                sections, _ = sections_future.result()
+            else:
+                sections = [
+                    {
+                        "title": "",
+                        "content": text,
+                    }
+                ]
+
+        # section summaries - these LLM calls are independent of each other, so we make them concurrently
+        get_section_summaries = auto_context_config.get("get_section_summaries", False)
+        if get_section_summaries and len(sections) > 1:
+            section_summarization_guidance = auto_context_config.get(
+                "section_summarization_guidance", ""
             )
+            with concurrent.futures.ThreadPoolExecutor() as executor:
+                futures = [
+                    executor.submit(
+                        get_section_summary,
+                        self.auto_context_model,
+                        section["content"],
+                        document_title=document_title,
+                        section_title=section["title"],
+                        section_summarization_guidance=section_summarization_guidance,
+                        language=self.kb_metadata["language"],
+                    )
+                    for section in sections
+                ]
+                section_summaries = [future.result() for future in futures]
         else:
-            document_summary = ""
+            section_summaries = ["" for _ in sections]
 
         # split the document into chunks
         chunks = (
             []
         )  # chunks is a list of dictionaries with keys 'chunk_text', 'document_title', 'document_summary', 'section_title', 'section_summary'
-        for section in sections:
+        for section, section_summary in zip(sections, section_summaries):
             section_text = section["content"]
             section_title = section["title"]
 
-            # section summary
-            get_section_summaries = auto_context_config.get(
-                "get_section_summaries", False
-            )
-            if get_section_summaries and len(sections) > 1:
-                section_summarization_guidance = auto_context_config.get(
-                    "section_summarization_guidance", ""
-                )
-                section_summary = get_section_summary(
-                    self.auto_context_model,
-                    section_text,
-                    document_title=document_title,
-                    section_title=section_title,
-                    section_summarization_guidance=section_summarization_guidance,
-                    language=self.kb_metadata["language"]
-                )
-            else:
-                section_summary = ""
-
             # break section into chunks
             if len(section_text) < min_length_for_chunking:
                 chunks.append(
@@ -318,15 +336,20 @@ class KnowledgeBase:
         if pdf_pages is not None:
             chunks = get_pages_from_chunks(text, pdf_pages, chunks)
 
-        # prepare the chunks for embedding by prepending the chunk headers
-        chunks_to_embed = []
-        for i, chunk in enumerate(chunks):
-            chunk_header = get_chunk_header(
+        # build each chunk header once - it's needed both for embedding and for the vector metadata below
+        chunk_headers = [
+            get_chunk_header(
                 document_title=chunk["document_title"],
                 document_summary=chunk["document_summary"],
                 section_title=chunk["section_title"],
                 section_summary=chunk["section_summary"],
             )
+            for chunk in chunks
+        ]
+
+        # prepare the chunks for embedding by prepending the chunk headers
+        chunks_to_embed = []
+        for chunk, chunk_header in zip(chunks, chunk_headers):
             chunk_to_embed = f"{chunk_header}\n\n{chunk['chunk_text']}"
             chunks_to_embed.append(chunk_to_embed)
 
@@ -337,12 +360,19 @@ class KnowledgeBase:
                 chunks_to_embed, input_type="document"
             )
         else:
-            # if the document is long, we need to get the embeddings in chunks
-            chunk_embeddings = []
-            for i in range(0, len(chunks), 50):
-                chunk_embeddings += self.get_embeddings(
-                    chunks_to_embed[i : i + 50], input_type="document"
-                )
+            # if the document is long, we need to get the embeddings in batches - the batches are independent, so we request them concurrently
+            with concurrent.futures.ThreadPoolExecutor() as executor:
+                futures = [
+                    executor.submit(
+                        self.get_embeddings,
+                        chunks_to_embed[i : i + 50],
+                        input_type="document",
+                    )
+                    for i in range(0, len(chunks_to_embed), 50)
+                ]
+                chunk_embeddings = []
+                for future in futures:
+                    chunk_embeddings += future.result()
 
         # add the chunks to the chunk database
         assert len(chunks) == len(chunk_embeddings) == len(chunks_to_embed)
@@ -372,12 +402,7 @@ class KnowledgeBase:
                     "doc_id": doc_id,
                     "chunk_index": i,
                     "chunk_text": chunk["chunk_text"],
-                    "chunk_header": get_chunk_header(
-                        document_title=chunk["document_title"],
-                        document_summary=chunk["document_summary"],
-                        section_title=chunk["section_title"],
-                        section_summary=chunk["section_summary"],
-                    ),
+                    "chunk_header": chunk_headers[i],
                     "chunk_page_start": chunk.get("chunk_page_start", ""),
                     "chunk_page_end": chunk.get("chunk_page_end", ""),
                     # Add the rest of the metadata to the vector metadata
@@ -411,9 +436,7 @@ class KnowledgeBase:
         """
         Note: it's very important that chunk overlap is set to 0 here, since results are created by concatenating chunks.
         """
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size, chunk_overlap=0, length_function=len
-        )
+        text_splitter = _get_text_splitter(chunk_size)
         texts = text_splitter.create_documents([text])
         chunks = [text.page_content for text in texts]
         return chunks
@@ -461,13 +484,13 @@ class KnowledgeBase:
     def get_segment_text_from_database(
         self, doc_id: str, chunk_start: int, chunk_end: int
     ) -> str:
-        segment = f"{self.get_segment_header(doc_id=doc_id, chunk_index=chunk_start)}\n\n"  # initialize the segment with the segment header
+        segment_parts = [f"{self.get_segment_header(doc_id=doc_id, chunk_index=chunk_start)}\n\n"]  # initialize the segment with the segment header
         for chunk_index in range(
             chunk_start, chunk_end
         ):  # NOTE: end index is non-inclusive
             chunk_text = self.get_chunk_text(doc_id, chunk_index) or ""
-            segment += chunk_text
-        return segment.strip()
+            segment_parts.append(chunk_text)
+        return "".join(segment_parts).strip()
 
     def query(
         self,
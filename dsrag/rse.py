@@ -142,11 +142,9 @@ def adjust_relevance_values_for_chunk_length(relevance_values: list[float], chun
     - reference_length is the length of a standard chunk, measured in number of characters (default is 700 characters, because this is the average length of a chunk when you set the max to 800, which is the default.)
     """
     assert len(relevance_values) == len(chunk_lengths), "The length of relevance_values and chunk_lengths must be the same"
-    adjusted_relevance_values = []
-    for relevance_value, chunk_length in zip(relevance_values, chunk_lengths):
-        bounded_chunk_length = max(chunk_length, 350) # don't adjust relevance values down too much for very short chunks
-        adjusted_relevance_values.append(relevance_value * (bounded_chunk_length / reference_length))
-    return adjusted_relevance_values
+    bounded_chunk_lengths = np.maximum(chunk_lengths, 350) # don't adjust relevance values down too much for very short chunks
+    adjusted_relevance_values = np.asarray(relevance_values) * (bounded_chunk_lengths / reference_length)
+    return adjusted_relevance_values.tolist()
 
 RSE_PARAMS_PRESETS = {
     "balanced": {
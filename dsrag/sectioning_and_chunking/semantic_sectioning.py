@@ -1,10 +1,21 @@
+import concurrent.futures
+import functools
+import hashlib
 import os
+import sqlite3
+import textwrap
+import numpy as np
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from anthropic import Anthropic
 from openai import OpenAI
 import instructor
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 class Section(BaseModel):
     title: str = Field(description="main topic of this section of the document (very descriptive)")
@@ -14,72 +25,162 @@ class StructuredDocument(BaseModel):
     """obtains meaningful sections, each centered around a single concept/topic"""
     sections: List[Section] = Field(description="a list of sections of the document")
 
+# wrap the response model in Instructor's OpenAISchema once at module scope - when passed a plain BaseModel, Instructor rebuilds the wrapper class and regenerates its JSON schema on every create call, and passing the pre-wrapped class skips that per-call work
+_StructuredDocumentSchema = instructor.openai_schema(StructuredDocument)
+
 
-SYSTEM_PROMPT = """
-Read the document below and extract a StructuredDocument object from it where each section of the document is centered around a single concept/topic. Whenever possible, your sections (and section titles) should match up with the natural sections of the document (i.e. Introduction, Conclusion, References, etc.). Sections can vary in length, but should generally be anywhere from a few paragraphs to a few pages long.
-Each line of the document is marked with its line number in square brackets (e.g. [1], [2], [3], etc). Use the line numbers to indicate section start.
-The start line numbers will be treated as inclusive. For example, if the first line of a section is line 5, the start_index should be 5. Your goal is to find the starting line number of a given section, where a section is a group of lines that are thematically related.
-The first section must start at the first line number of the document ({start_line} in this case). The sections MUST cover the entire document. 
-Section titles should be descriptive enough such that a person who is just skimming over the section titles and not actually reading the document can get a clear idea of what each section is about.
-Note: the document provided to you may just be an excerpt from a larger document, rather than a complete document. Therefore, you can't always assume, for example, that the first line of the document is the beginning of the Introduction section and the last line is the end of the Conclusion section (if those section are even present).
-"""
+SYSTEM_PROMPT = textwrap.dedent("""
+    Extract a StructuredDocument from the document below, where each section is centered around a single concept/topic. Prefer the document's natural sections (Introduction, Conclusion, References, etc.) for boundaries and titles. Sections should generally be a few paragraphs to a few pages long.
+    Each line is marked with its line number in square brackets. Set each section's start_index to the (inclusive) line number where it begins. The first section must start at the document's first line number (which is stated in the user message), and the sections must cover the entire document.
+    Section titles must be descriptive enough that someone skimming only the titles can tell what each section is about.
+    The document may just be an excerpt from a larger document, so don't assume it begins with an Introduction or ends with a Conclusion.
+    """).strip()
 
 LANGUAGE_ADDENDUM = "For your section titles, YOU MUST use the same language as the document. If the document is in English, your section titles should be in English. If the document is in another language, your section titles should be in that language."
 
+PROMPT_VERSION = 4 # increment this whenever the prompts above change, so stale cache entries aren't reused
+
+LLM_TIMEOUT_SECONDS = 60.0 # per-call timeout so a single slow window can't stall ingestion of the whole document
+LLM_MAX_RETRIES = 2 # bounded retries for failed/unparseable responses (the provider SDKs apply exponential backoff to transient errors like rate limits and timeouts)
+
+CACHE_DIRECTORY = "~/.cache/dsrag"
+
+_cache_unavailable = False # set on the first cache failure (e.g. unwritable cache directory) so we don't retry the filesystem on every window
+
+def _dump_structured_document(structured_doc: StructuredDocument) -> str:
+    # use orjson when available for the cache write path - it's noticeably faster and allocates less than the default JSON serializer
+    if orjson is not None:
+        return orjson.dumps(structured_doc.model_dump()).decode()
+    return structured_doc.model_dump_json()
+
+def _load_structured_document(value: str) -> StructuredDocument:
+    if orjson is not None:
+        return StructuredDocument.model_validate(orjson.loads(value))
+    return StructuredDocument.model_validate_json(value)
+
+def _get_cache_db_path() -> str:
+    cache_directory = os.path.expanduser(CACHE_DIRECTORY)
+    os.makedirs(cache_directory, exist_ok=True)
+    return os.path.join(cache_directory, "semantic_sectioning.db")
+
+def _cache_get(key: str) -> Optional[str]:
+    global _cache_unavailable
+    if _cache_unavailable:
+        return None
+    try:
+        conn = sqlite3.connect(_get_cache_db_path())
+        try:
+            conn.execute("CREATE TABLE IF NOT EXISTS structured_documents (key TEXT PRIMARY KEY, value TEXT)")
+            result = conn.execute("SELECT value FROM structured_documents WHERE key = ?", (key,)).fetchone()
+            return result[0] if result else None
+        finally:
+            conn.close()
+    except (sqlite3.Error, OSError):
+        # the cache is purely an optimization, so never let it break sectioning - OSError covers an uncreatable/unwritable cache directory
+        _cache_unavailable = True
+        return None
+
+def _cache_set(key: str, value: str) -> None:
+    global _cache_unavailable
+    if _cache_unavailable:
+        return
+    try:
+        conn = sqlite3.connect(_get_cache_db_path())
+        try:
+            conn.execute("CREATE TABLE IF NOT EXISTS structured_documents (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("INSERT OR REPLACE INTO structured_documents (key, value) VALUES (?, ?)", (key, value))
+            conn.commit()
+        finally:
+            conn.close()
+    except (sqlite3.Error, OSError):
+        _cache_unavailable = True
+
 
 def get_document_lines(document: str) -> List[str]:
     document_lines = document.split("\n")
     return document_lines
 
-def get_document_with_lines(document_lines: List[str], start_line: int, max_characters: int) -> str:
-    document_with_line_numbers = ""
-    character_count = 0
-    for i in range(start_line, len(document_lines)):
-        line = document_lines[i]
-        document_with_line_numbers += f"[{i}] {line}\n"
-        character_count += len(line)
-        if character_count > max_characters or i == len(document_lines) - 1:
-            end_line = i
-            break
-    return document_with_line_numbers, end_line
+def get_annotated_lines(document_lines: List[str]) -> List[str]:
+    # format each line as "[i] line\n" exactly once per document, so each window can be assembled by slicing and joining instead of re-formatting every line
+    return [f"[{i}] {line}\n" for i, line in enumerate(document_lines)]
+
+def get_cumulative_line_lengths(document_lines: List[str]) -> np.ndarray:
+    # cumulative_line_lengths[i] is the total number of characters in lines 0 through i - computed once per document so each window's end line can be found with a binary search
+    return np.cumsum(np.fromiter((len(line) for line in document_lines), dtype=np.int64, count=len(document_lines)))
+
+def get_document_with_lines(annotated_lines: List[str], cumulative_line_lengths: np.ndarray, start_line: int, max_characters: int) -> str:
+    # the end line is the first line where the window's character count exceeds max_characters (or the last line of the document)
+    base_character_count = int(cumulative_line_lengths[start_line - 1]) if start_line > 0 else 0
+    end_line = int(np.searchsorted(cumulative_line_lengths, base_character_count + max_characters, side="right"))
+    end_line = min(end_line, len(annotated_lines) - 1)
+    return "".join(annotated_lines[start_line:end_line+1]), end_line
+
+@functools.lru_cache(maxsize=None)
+def _get_instructor_client(llm_provider: str, base_url: Optional[str] = None):
+    """
+    Constructing an OpenAI/Anthropic client creates a fresh HTTP connection pool, so we cache one Instructor-wrapped client per provider and reuse its connections across all sectioning calls.
+    """
+    if llm_provider == "anthropic":
+        if base_url is not None:
+            return instructor.from_anthropic(Anthropic(api_key=os.environ["ANTHROPIC_API_KEY"], base_url=base_url))
+        return instructor.from_anthropic(Anthropic(api_key=os.environ["ANTHROPIC_API_KEY"]))
+    elif llm_provider == "openai":
+        if base_url is not None:
+            return instructor.from_openai(OpenAI(api_key=os.environ["OPENAI_API_KEY"], base_url=base_url))
+        return instructor.from_openai(OpenAI(api_key=os.environ["OPENAI_API_KEY"]))
+    else:
+        raise ValueError("Invalid provider. Must be either 'anthropic' or 'openai'.")
 
 def get_structured_document(document_with_line_numbers: str, start_line: int, end_line: int, llm_provider: str, model: str, language: str) -> StructuredDocument:
     """
     Note: This function relies on Instructor, which only supports certain model providers. That's why this function doesn't use the LLM abstract base class that is used elsewhere in the project.
     """
 
-    formatted_system_prompt = SYSTEM_PROMPT.format(start_line=start_line)
+    # the system prompt is kept byte-identical across calls (start_line goes in the user message instead) so provider-side prompt caching can reuse the shared prefix
+    formatted_system_prompt = SYSTEM_PROMPT
     if language != "en":
         formatted_system_prompt += "\n" + LANGUAGE_ADDENDUM
 
+    user_message = f"The first line of this document is line {start_line}.\n\n{document_with_line_numbers}"
+
+    # these calls are made at temperature 0, so they're deterministic enough to cache on disk - this makes re-ingesting the same document (nearly) free
+    use_cache = os.environ.get("DSRAG_DISABLE_SEMANTIC_SECTIONING_CACHE", None) is None
+    if use_cache:
+        cache_key = hashlib.sha256(f"{llm_provider}|{model}|{language}|{PROMPT_VERSION}|{start_line}|{end_line}|{document_with_line_numbers}".encode()).hexdigest()
+        cached_value = _cache_get(cache_key)
+        if cached_value is not None:
+            return _load_structured_document(cached_value)
+
     if llm_provider == "anthropic":
         base_url = os.environ.get("DSRAG_ANTHROPIC_BASE_URL", None)
-        if base_url is not None:
-            client = instructor.from_anthropic(Anthropic(api_key=os.environ["ANTHROPIC_API_KEY"], base_url=base_url))
-        else:
-            client = instructor.from_anthropic(Anthropic(api_key=os.environ["ANTHROPIC_API_KEY"]))
-        return client.chat.completions.create(
+        client = _get_instructor_client("anthropic", base_url)
+        structured_doc = client.chat.completions.create(
             model=model,
-            response_model=StructuredDocument,
+            response_model=_StructuredDocumentSchema,
+            max_retries=LLM_MAX_RETRIES,
+            timeout=LLM_TIMEOUT_SECONDS,
             max_tokens=4000,
             temperature=0.0,
-            system=formatted_system_prompt,
+            # the system prompt must go in messages rather than the system= kwarg: Instructor extracts system-role messages into the Anthropic system parameter and overwrites anything passed via system= directly
             messages=[
+                {
+                    "role": "system",
+                    "content": formatted_system_prompt,
+                },
                 {
                     "role": "user",
-                    "content": document_with_line_numbers,
+                    "content": user_message,
                 },
             ],
         )
     elif llm_provider == "openai":
         base_url = os.environ.get("DSRAG_OPENAI_BASE_URL", None)
-        if base_url is not None:
-            client = instructor.from_openai(OpenAI(api_key=os.environ["OPENAI_API_KEY"], base_url=base_url))
-        else:
-            client = instructor.from_openai(OpenAI(api_key=os.environ["OPENAI_API_KEY"]))
-        return client.chat.completions.create(
+        client = _get_instructor_client("openai", base_url)
+        structured_doc = client.chat.completions.create(
             model=model,
-            response_model=StructuredDocument,
+            response_model=_StructuredDocumentSchema,
+            max_retries=LLM_MAX_RETRIES,
+            timeout=LLM_TIMEOUT_SECONDS,
             max_tokens=4000,
             temperature=0.0,
             messages=[
@@ -89,28 +190,68 @@ def get_structured_document(document_with_line_numbers: str, start_line: int, en
                 },
                 {
                     "role": "user",
-                    "content": document_with_line_numbers,
+                    "content": user_message,
                 },
             ],
         )
     else:
         raise ValueError("Invalid provider. Must be either 'anthropic' or 'openai'.")
 
-def get_sections_text(sections: List[Section], document_lines: List[str]):
+    if use_cache:
+        _cache_set(cache_key, _dump_structured_document(structured_doc))
+    return structured_doc
+
+def is_valid_partition(sections: List[Tuple[int, str]], start_line: int, end_line: int) -> bool:
     """
-    Takes in a list of Section objects and returns a list of dictionaries containing the attributes of each Section object plus the content of the section.
+    Checks that the sections (a list of (start_index, title) tuples) form a valid partition of the line range [start_line, end_line]: the first section starts at start_line and the start indices are strictly increasing and in range. Since each section implicitly ends where the next one begins, these conditions guarantee full coverage with no gaps or overlaps.
+    """
+    if len(sections) == 0:
+        return False
+    start_indices = np.fromiter((s[0] for s in sections), dtype=np.int64, count=len(sections))
+    # first section starts at start_line, starts are strictly increasing, and the last one is in range - together these imply all starts are in range
+    return bool(
+        start_indices[0] == start_line
+        and start_indices[-1] <= end_line
+        and np.all(np.diff(start_indices) > 0)
+    )
+
+def partition_sections(sections: List[Tuple[int, str]], start_line: int, end_line: int) -> List[Tuple[int, str]]:
+    """
+    Repairs a list of (start_index, title) tuples into a valid partition of [start_line, end_line]. The LLM occasionally returns out-of-range or non-increasing start indices, and combining independently sectioned windows can produce inconsistent boundaries at the seams - drop those sections and make sure the first section starts at start_line.
+    """
+    if len(sections) == 0:
+        # degenerate case: treat the entire range as a single untitled section
+        return [(start_line, "")]
+    start_indices = np.fromiter((s[0] for s in sections), dtype=np.int64, count=len(sections))
+    in_range_indices = np.nonzero((start_indices >= start_line) & (start_indices <= end_line))[0]
+    if len(in_range_indices) == 0:
+        return [(start_line, "")]
+    in_range_starts = start_indices[in_range_indices]
+    # a section survives iff its start index is strictly greater than every start index before it - since each new prefix maximum is itself kept, comparing against the running maximum of all previous starts is equivalent to comparing against the previous kept start
+    prefix_max = np.maximum.accumulate(in_range_starts)
+    keep_mask = np.empty(len(in_range_starts), dtype=bool)
+    keep_mask[0] = True
+    keep_mask[1:] = in_range_starts[1:] > prefix_max[:-1]
+    partitioned_sections = [sections[i] for i in in_range_indices[keep_mask]]
+    if partitioned_sections[0][0] != start_line:
+        partitioned_sections[0] = (start_line, partitioned_sections[0][1])
+    return partitioned_sections
+
+def get_sections_text(sections: List[Tuple[int, str]], document_lines: List[str]):
+    """
+    Takes in a list of (start_index, title) tuples and returns a list of dictionaries containing the attributes of each section plus the content of the section.
     """
     section_dicts = []
-    for i,s in enumerate(sections):
+    for i, (start_index, title) in enumerate(sections):
         if i == len(sections) - 1:
             end_index = len(document_lines) - 1
         else:
-            end_index = sections[i+1].start_index - 1
-        contents = document_lines[s.start_index:end_index+1] # +1 because end_index is inclusive
+            end_index = sections[i+1][0] - 1
+        contents = document_lines[start_index:end_index+1] # +1 because end_index is inclusive
         section_dicts.append({
-            "title": s.title,
+            "title": title,
             "content": "\n".join(contents),
-            "start": s.start_index,
+            "start": start_index,
             "end": end_index
         })
     return section_dicts
@@ -131,25 +272,32 @@ def get_sections(document: str, max_characters: int = 20000, llm_provider: str =
         - end: int - line number where the section ends (inclusive)
         - content: str - the text of the section
     """
-    max_iterations = 2*(len(document) // max_characters + 1)
     document_lines = get_document_lines(document)
+    annotated_lines = get_annotated_lines(document_lines)
+    cumulative_line_lengths = get_cumulative_line_lengths(document_lines)
+
+    # precompute all of the windows in one pass - each window starts on the line after the previous one ends
+    windows = [] # list of (document_with_line_numbers, start_line, end_line) tuples
     start_line = 0
+    while start_line < len(document_lines):
+        document_with_line_numbers, end_line = get_document_with_lines(annotated_lines, cumulative_line_lengths, start_line, max_characters)
+        windows.append((document_with_line_numbers, start_line, end_line))
+        start_line = end_line + 1
+
+    # with fixed boundaries the windows are independent, so we section them all concurrently - K sequential LLM round-trips become one
     all_sections = []
-    for _ in range(max_iterations):
-        document_with_line_numbers, end_line = get_document_with_lines(document_lines, start_line, max_characters)
-        structured_doc = get_structured_document(document_with_line_numbers, start_line, end_line, llm_provider=llm_provider, model=model, language=language)
-        new_sections = structured_doc.sections
-        all_sections.extend(new_sections)
-        
-        if end_line >= len(document_lines) - 1:
-            # reached the end of the document
-            break
-        else:
-            if len(new_sections) > 1:
-                start_line = all_sections[-1].start_index # start from the next line after the last section
-                all_sections.pop()
-            else:
-                start_line = end_line + 1
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        futures = [
+            executor.submit(get_structured_document, document_with_line_numbers, window_start_line, window_end_line, llm_provider=llm_provider, model=model, language=language)
+            for document_with_line_numbers, window_start_line, window_end_line in windows
+        ]
+        for future in futures:
+            # convert the Pydantic Section objects to plain tuples right after parsing - everything downstream only needs (start_index, title), and tuple access is much cheaper than Pydantic attribute access
+            all_sections.extend((s.start_index, s.title) for s in future.result().sections)
+
+    # repair any invalid boundaries, whether from the LLM itself or from the window seams
+    if not is_valid_partition(all_sections, 0, len(document_lines) - 1):
+        all_sections = partition_sections(all_sections, 0, len(document_lines) - 1)
 
     # get the section text
     section_dicts = get_sections_text(all_sections, document_lines)
@@ -0,0 +1,82 @@
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from dsrag.sectioning_and_chunking.semantic_sectioning import (
+    is_valid_partition,
+    partition_sections,
+    get_sections_text,
+    get_annotated_lines,
+    get_cumulative_line_lengths,
+    get_document_with_lines,
+)
+
+
+class TestPartitioning(unittest.TestCase):
+    def test__is_valid_partition(self):
+        sections = [(0, "Introduction"), (10, "Methods"), (25, "Conclusion")]
+        self.assertTrue(is_valid_partition(sections, 0, 30))
+
+    def test__is_valid_partition_invalid(self):
+        # empty
+        self.assertFalse(is_valid_partition([], 0, 30))
+        # doesn't start at start_line
+        self.assertFalse(is_valid_partition([(1, "A"), (10, "B")], 0, 30))
+        # start indices not strictly increasing
+        self.assertFalse(is_valid_partition([(0, "A"), (10, "B"), (10, "C")], 0, 30))
+        self.assertFalse(is_valid_partition([(0, "A"), (20, "B"), (10, "C")], 0, 30))
+        # start index out of range
+        self.assertFalse(is_valid_partition([(0, "A"), (31, "B")], 0, 30))
+
+    def test__partition_sections(self):
+        sections = [(0, "A"), (31, "B"), (10, "C"), (5, "D"), (25, "E")]
+        partitioned = partition_sections(sections, 0, 30)
+        self.assertEqual(partitioned, [(0, "A"), (10, "C"), (25, "E")])
+        self.assertTrue(is_valid_partition(partitioned, 0, 30))
+
+    def test__partition_sections_fixes_first_start(self):
+        partitioned = partition_sections([(5, "A"), (10, "B")], 0, 30)
+        self.assertEqual(partitioned, [(0, "A"), (10, "B")])
+        self.assertTrue(is_valid_partition(partitioned, 0, 30))
+
+    def test__partition_sections_degenerate(self):
+        self.assertEqual(partition_sections([], 0, 30), [(0, "")])
+        self.assertEqual(partition_sections([(50, "A")], 0, 30), [(0, "")])
+
+    def test__get_sections_text(self):
+        document_lines = ["line 0", "line 1", "line 2", "line 3", "line 4"]
+        sections = [(0, "A"), (3, "B")]
+        section_dicts = get_sections_text(sections, document_lines)
+        self.assertEqual(len(section_dicts), 2)
+        self.assertEqual(section_dicts[0]["content"], "line 0\nline 1\nline 2")
+        self.assertEqual(section_dicts[0]["start"], 0)
+        self.assertEqual(section_dicts[0]["end"], 2)
+        self.assertEqual(section_dicts[1]["content"], "line 3\nline 4")
+        self.assertEqual(section_dicts[1]["start"], 3)
+        self.assertEqual(section_dicts[1]["end"], 4)
+
+
+class TestDocumentWindows(unittest.TestCase):
+    def test__get_document_with_lines(self):
+        document_lines = ["aaaa", "bbbb", "cccc", "dddd"]
+        annotated_lines = get_annotated_lines(document_lines)
+        cumulative_line_lengths = get_cumulative_line_lengths(document_lines)
+
+        # the window ends on the first line that pushes the character count over max_characters
+        document_with_line_numbers, end_line = get_document_with_lines(
+            annotated_lines, cumulative_line_lengths, 0, 10
+        )
+        self.assertEqual(end_line, 2)
+        self.assertEqual(document_with_line_numbers, "[0] aaaa\n[1] bbbb\n[2] cccc\n")
+
+        # a window that fits the rest of the document ends on the last line
+        document_with_line_numbers, end_line = get_document_with_lines(
+            annotated_lines, cumulative_line_lengths, 3, 10
+        )
+        self.assertEqual(end_line, 3)
+        self.assertEqual(document_with_line_numbers, "[3] dddd\n")
+
+
+if __name__ == "__main__":
+    unittest.main()